@@ -1,23 +1,48 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 import os
-import json
+import orjson
 import asyncio
+import itertools
+import string
+import hashlib
 import httpx
+import numpy as np
 import google.generativeai as genai
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    HnswConfigDiff,
+    SearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    QuantizationSearchParams,
+)
 from sentence_transformers import SentenceTransformer
+from cachetools import TTLCache, LRUCache
+import torch
 import logging
 from datetime import datetime
 import aiofiles
 import uuid
 from pathlib import Path
+from urllib.parse import urlsplit
+import shutil
 import time
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,16 +51,26 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Medical Deep-Research Chat System",
     description="AI-powered medical research chat system with web search and document analysis",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware
+# CORS middleware: explicit origin, methods and headers instead of "*".
+# Pinning also lets browsers cache the preflight for a day, so most
+# requests skip the extra OPTIONS round trip entirely.
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
+
+# Compress responses above 1KB; level 5 trades a little ratio for much
+# lower CPU than the default 9, and chat payloads are highly compressible
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for development
+    allow_origins=[FRONTEND_URL],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
 # Environment variables
@@ -53,11 +88,182 @@ else:
     logger.warning("Gemini API key not found")
     model = None
 
-# Initialize Qdrant client
-qdrant_client = QdrantClient(url=QDRANT_URL)
+# Initialize Qdrant client (native asyncio; no thread-pool hand-off)
+qdrant_client = AsyncQdrantClient(url=QDRANT_URL, prefer_grpc=True, grpc_port=6334)
+
+# int8 ONNX Runtime embedder: dynamic quantization lets the GEMMs run as
+# int8 (VNNI), 2-4x faster than FP32 PyTorch on CPU with ~4x less memory.
+class OnnxEmbedder:
+    MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+    QUANTIZED_DIR = Path("onnx_int8")
+
+    def __init__(self):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        if not (self.QUANTIZED_DIR / "model_quantized.onnx").exists():
+            # Per-core workers all run this on a cold start: quantize into a
+            # pid-private directory and atomically rename it into place, so
+            # no worker ever loads a half-written model file
+            tmp_dir = Path(f"{self.QUANTIZED_DIR}.tmp.{os.getpid()}")
+            exported = ORTModelForFeatureExtraction.from_pretrained(self.MODEL_ID, export=True)
+            quantizer = ORTQuantizer.from_pretrained(exported)
+            quantizer.quantize(
+                save_dir=tmp_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False)
+            )
+            try:
+                tmp_dir.rename(self.QUANTIZED_DIR)
+            except OSError:
+                # Another worker renamed first; its copy is authoritative
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.MODEL_ID)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            self.QUANTIZED_DIR, file_name="model_quantized.onnx"
+        )
 
-# Initialize SentenceTransformer
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = True, **kwargs):
+        """Tokenize -> session.run -> mean-pool -> L2-normalize.
+
+        Mirrors SentenceTransformer.encode closely enough for the call
+        sites in this module (single string or list of strings).
+        """
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        pooled_batches = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            inputs = self.tokenizer(batch, padding=True, truncation=True, return_tensors="np")
+            hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled_batches.append(pooled)
+        embeddings = np.concatenate(pooled_batches, axis=0)
+        if normalize_embeddings:
+            norms = np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+            embeddings = embeddings / norms
+        return embeddings[0] if single else embeddings
+
+# Initialize the embedder, preferring the quantized ONNX path
+try:
+    embedder = OnnxEmbedder()
+    logger.info("Initialized int8 ONNX embedder")
+except Exception as e:
+    logger.warning(f"ONNX embedder unavailable ({e}). Using SentenceTransformer.")
+    embedder = SentenceTransformer('all-MiniLM-L6-v2')
+
+# On the PyTorch fallback, spread intra-op GEMMs across all cores (container
+# defaults often pin this to 1) and put the model in eval mode
+if isinstance(embedder, SentenceTransformer):
+    torch.set_num_threads(os.cpu_count() or 4)
+    try:
+        torch.set_num_interop_threads(2)
+    except RuntimeError:
+        pass  # interop pool already started
+    embedder.eval()
+
+# Cache full AI responses for identical (query, sources) pairs so repeats
+# cost a dict lookup instead of a multi-second Gemini round-trip
+RESP_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=600)
+
+# Micro-batched embedding: encode requests arriving within a short window
+# are drained into one batched forward pass (amortizing tokenizer + matmul
+# overhead), and finished vectors are kept in an LRU cache.
+EMBED_BATCH_WINDOW = 0.005  # seconds
+EMBED_BATCH_SIZE = 32
+EMBED_CACHE: LRUCache = LRUCache(maxsize=4096)
+_embed_pending: List[Any] = []
+_embed_drain_scheduled = False
+
+def _encode_batch(texts: List[str]):
+    if isinstance(embedder, SentenceTransformer):
+        # inference_mode skips autograd bookkeeping on the forward pass
+        with torch.inference_mode():
+            return embedder.encode(
+                texts,
+                batch_size=EMBED_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+    return embedder.encode(
+        texts,
+        batch_size=EMBED_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+
+async def _drain_embed_queue():
+    global _embed_drain_scheduled
+    await asyncio.sleep(EMBED_BATCH_WINDOW)
+    _embed_drain_scheduled = False
+    pending, _embed_pending[:] = _embed_pending[:], []
+    if not pending:
+        return
+    texts = [text for text, _ in pending]
+    try:
+        vectors = await asyncio.to_thread(_encode_batch, texts)
+    except Exception as e:
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(e)
+        return
+    for (text, future), vector in zip(pending, vectors):
+        embedding = vector.tolist()
+        EMBED_CACHE[text] = embedding
+        if not future.done():
+            future.set_result(embedding)
+
+async def get_embedding(query: str) -> List[float]:
+    cached = EMBED_CACHE.get(query)
+    if cached is not None:
+        return cached
+    global _embed_drain_scheduled
+    future = asyncio.get_running_loop().create_future()
+    _embed_pending.append((query, future))
+    if not _embed_drain_scheduled:
+        _embed_drain_scheduled = True
+        asyncio.create_task(_drain_embed_queue())
+    return await future
+
+# Batched cosine top-k reranker. With numba installed the loop is JIT
+# compiled with parallel=True/fastmath, spreading rows across cores; the
+# first call pays compilation, cache=True reuses it across restarts.
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _cosine_scores(q, M):
+        n = M.shape[0]
+        scores = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            dot = 0.0
+            norm = 0.0
+            for j in range(M.shape[1]):
+                dot += q[j] * M[i, j]
+                norm += M[i, j] * M[i, j]
+            scores[i] = dot / max(np.sqrt(norm), 1e-12)
+        return scores
+else:
+    def _cosine_scores(q, M):
+        norms = np.clip(np.linalg.norm(M, axis=1), 1e-12, None)
+        return (M @ q) / norms
+
+def cosine_topk(q: np.ndarray, M: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k rows of M most cosine-similar to unit query q,
+    best first."""
+    scores = _cosine_scores(
+        np.ascontiguousarray(q, dtype=np.float32),
+        np.ascontiguousarray(M, dtype=np.float32),
+    )
+    k = min(k, scores.shape[0])
+    # argpartition is O(n) vs O(n log n) for a full sort; only the k
+    # selected entries need ordering
+    top = np.argpartition(scores, -k)[-k:]
+    return top[np.argsort(scores[top])[::-1]]
+
+async def rerank_topk(q, vectors, k: int) -> np.ndarray:
+    return await asyncio.to_thread(cosine_topk, np.asarray(q), np.asarray(vectors), k)
 
 # Data models
 class ChatMessage(BaseModel):
@@ -79,82 +285,149 @@ class ChatResponse(BaseModel):
     session_id: str
     timestamp: str
 
+# Sources in responses only need a snippet; full article bodies inflate
+# the JSON payload without adding anything the frontend renders
+SOURCE_PREVIEW_CHARS = 500
+
+def preview_sources(sources: List[SearchResult]) -> List[SearchResult]:
+    return [
+        source if len(source.content) <= SOURCE_PREVIEW_CHARS
+        else source.copy(update={"content": source.content[:SOURCE_PREVIEW_CHARS] + "..."})
+        for source in sources
+    ]
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # set gives O(1) add/discard; the lock keeps membership updates
+        # consistent under concurrent connect/disconnect churn
+        self.active_connections: Set[WebSocket] = set()
+        self._lock = asyncio.Lock()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        async with self._lock:
+            self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        # discard is idempotent, so duplicate disconnects are harmless
+        self.active_connections.discard(websocket)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
 
 manager = ConnectionManager()
 
+# Cached wall-clock timestamp, refreshed once per second by a background
+# task: responses only need second resolution, so per-call datetime.now()
+# plus isoformat() is wasted work on the hot path
+_now_iso = datetime.now().isoformat()
+
+async def _clock_tick():
+    global _now_iso
+    while True:
+        _now_iso = datetime.now().isoformat()
+        await asyncio.sleep(1)
+
+def now_iso() -> str:
+    return _now_iso
+
 # Initialize Qdrant collection
 async def init_qdrant():
     try:
-        collections = await asyncio.to_thread(qdrant_client.get_collections)
-        collection_names = [col.name for col in collections.collections]
-        
-        if "medical_documents" not in collection_names:
-            await asyncio.to_thread(
-                qdrant_client.create_collection,
+        # Probe the one collection we need instead of listing everything;
+        # a single small RPC and no O(n_collections) payload on startup
+        try:
+            await qdrant_client.get_collection("medical_documents")
+            logger.info("medical_documents collection already exists")
+            return
+        except Exception:
+            pass
+
+        try:
+            await qdrant_client.create_collection(
                 collection_name="medical_documents",
-                vectors_config=VectorParams(size=384, distance=Distance.COSINE)
+                vectors_config=VectorParams(size=384, distance=Distance.COSINE),
+                # Denser graph than the m=16/ef_construct=128 defaults:
+                # higher recall at the same search ef
+                hnsw_config=HnswConfigDiff(m=24, ef_construct=200),
+                # int8 storage cuts vector RAM ~4x; rescoring at query time
+                # keeps recall close to full precision
+                quantization_config=ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8,
+                        quantile=0.99,
+                        always_ram=True
+                    )
+                )
             )
             logger.info("Created medical_documents collection")
-        else:
-            logger.info("medical_documents collection already exists")
+        except Exception as e:
+            # Another replica may have created it between probe and create
+            if "exists" in str(e).lower():
+                logger.info("medical_documents collection already exists")
+            else:
+                raise
     except Exception as e:
         logger.error(f"Error initializing Qdrant: {e}")
 
 @app.on_event("startup")
 async def startup_event():
+    # Long-lived HTTP/2 client with a keepalive pool: repeated Serper calls
+    # reuse the TLS session instead of handshaking every time
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        headers={
+            "X-API-KEY": SERPER_API_KEY or "",
+            "Content-Type": "application/json"
+        }
+    )
+    # The loop holds only a weak reference to tasks, so keep a strong one
+    # on app.state or the clock task can be garbage-collected mid-run
+    app.state.clock_task = asyncio.create_task(_clock_tick())
     await init_qdrant()
     logger.info("Medical Deep-Research Chat System started successfully!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.clock_task.cancel()
+    await app.state.http.aclose()
+
 # Serper.dev web search
 async def search_web(query: str, num_results: int = 10) -> List[SearchResult]:
     try:
-        async with httpx.AsyncClient() as client:
-            headers = {
-                "X-API-KEY": SERPER_API_KEY,
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "q": query,
-                "num": num_results,
-                "hl": "en",
-                "gl": "us"
-            }
-            response = await client.post(
-                "https://google.serper.dev/search",
-                headers=headers,
-                json=payload,
-                timeout=30.0
-            )
-            if response.status_code == 200:
-                data = response.json()
-                results = []
-                for item in data.get("organic", []):
-                    domain = item.get("link", "").split("//")[-1].split("/")[0]
-                    results.append(SearchResult(
-                        title=item.get("title", ""),
-                        url=item.get("link", ""),
-                        content=item.get("snippet", ""),
-                        domain=domain,
-                        type="web"
-                    ))
-                logger.info(f"Found {len(results)} web results")
-                return results
-            else:
-                logger.warning(f"Serper API returned status code: {response.status_code}")
-                return []
+        payload = {
+            "q": query,
+            "num": num_results,
+            "hl": "en",
+            "gl": "us"
+        }
+        response = await app.state.http.post(
+            "https://google.serper.dev/search",
+            json=payload
+        )
+        if response.status_code == 200:
+            # orjson parses the body several times faster than stdlib json
+            data = orjson.loads(response.content)
+            results = []
+            for item in data.get("organic", []):
+                link = item.get("link", "")
+                # One C-level parse instead of two split() passes and their
+                # intermediate lists; also handles ports and odd schemes
+                domain = urlsplit(link).netloc
+                results.append(SearchResult(
+                    title=item.get("title", ""),
+                    url=link,
+                    content=item.get("snippet", ""),
+                    domain=domain,
+                    type="web"
+                ))
+            logger.info(f"Found {len(results)} web results")
+            return results
+        else:
+            logger.warning(f"Serper API returned status code: {response.status_code}")
+            return []
     except Exception as e:
         logger.error(f"Web search error: {e}")
         return []
@@ -162,19 +435,33 @@ async def search_web(query: str, num_results: int = 10) -> List[SearchResult]:
 # Local document search using Qdrant
 async def search_local_documents(query: str, limit: int = 5) -> List[SearchResult]:
     try:
-        # Generate embedding for the query
-        query_embedding = embedder.encode(query).tolist()
+        # Generate embedding for the query (batched + cached)
+        query_embedding = await get_embedding(query)
         
         # Search in Qdrant
-        search_results = await asyncio.to_thread(
-            qdrant_client.search,
+        # query_points keeps the vector in binary protobuf end to end and
+        # supports server-side prefetch/rerank, unlike the legacy search API.
+        # ef scales with the requested k (a fixed 100 wastes graph hops for
+        # small k), and fetching 3x candidates lets the exact-score re-sort
+        # below absorb quantization and HNSW approximation error.
+        query_response = await qdrant_client.query_points(
             collection_name="medical_documents",
-            query_vector=query_embedding,
-            limit=limit
+            query=query_embedding,
+            limit=limit * 3,
+            with_payload=True,
+            search_params=SearchParams(
+                hnsw_ef=max(64, 8 * limit),
+                quantization=QuantizationSearchParams(rescore=True, oversampling=2.0)
+            )
         )
+        candidates = sorted(
+            query_response.points,
+            key=lambda point: point.score,
+            reverse=True
+        )[:limit]
         
         results = []
-        for result in search_results:
+        for result in candidates:
             if hasattr(result, 'payload') and result.payload:
                 results.append(SearchResult(
                     title=result.payload.get("title", "Local Document"),
@@ -190,46 +477,92 @@ async def search_local_documents(query: str, limit: int = 5) -> List[SearchResul
         logger.error(f"Local search error: {e}")
         return []
 
+# Prepare numbered context strings from search results; generators + islice
+# avoid the intermediate slice and list allocations per request
+def build_contexts(web_results: List[SearchResult], local_results: List[SearchResult]):
+    web_context = "\n".join(
+        f"[{i}] {result.title}: {result.content}"
+        for i, result in enumerate(itertools.islice(web_results, 5), 1)
+    )
+    local_context = "\n".join(
+        f"[{i}] {result.title}: {result.content}"
+        for i, result in enumerate(itertools.islice(local_results, 3), 1)
+    )
+    return web_context, local_context
+
+# Compiled once at import: only the three dynamic fields are substituted
+# per request, and the prompt text is editable without touching code flow
+_PROMPT_TEMPLATE = string.Template("""
+                Based on the following medical and health information sources, provide a comprehensive and accurate response to the user's question: "$query"
+                
+                Web Sources:
+                $web_context
+                
+                Local Medical Documents:
+                $local_context
+                
+                Please provide:
+                1. A clear, evidence-based answer
+                2. Key medical findings
+                3. Important disclaimers about seeking professional medical advice
+                4. Reference to the provided sources
+                """)
+
+def build_prompt(query: str, web_context: str, local_context: str) -> str:
+    return _PROMPT_TEMPLATE.substitute(
+        query=query,
+        web_context=web_context,
+        local_context=local_context
+    )
+
+# Stream Gemini output chunk by chunk; the SDK is synchronous, so the call
+# and each chunk fetch run in worker threads
+async def stream_gemini(context: str):
+    stream = await asyncio.to_thread(model.generate_content, context, stream=True)
+    chunks = iter(stream)
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            break
+        if chunk.text:
+            yield chunk.text
+
 # Generate AI response using Gemini
 async def generate_ai_response(query: str, web_results: List[SearchResult], local_results: List[SearchResult]) -> Dict[str, Any]:
     try:
-        # Prepare context from search results
-        web_context = "\n".join([f"[{i+1}] {result.title}: {result.content}" for i, result in enumerate(web_results[:5])])
-        local_context = "\n".join([f"[{i+1}] {result.title}: {result.content}" for i, result in enumerate(local_results[:3])])
+        web_context, local_context = build_contexts(web_results, local_results)
         
         # Combine all sources
         sources = web_results + local_results
+
+        # Identical query + sources within the TTL window -> cached answer
+        cache_key = hashlib.blake2b(
+            orjson.dumps(
+                [query, [r.url for r in web_results[:5]], [r.title for r in local_results[:3]]]
+            )
+        ).digest()
+        cached = RESP_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
         
-        # Create web sources text for fallback
-        web_sources_text = ""
-        for i, result in enumerate(web_results[:5]):
-            web_sources_text += f"[{i+1}] {result.title}\nURL: {result.url}\nContent: {result.content[:200]}...\n\n"
+        # Create web sources text for fallback (single join, no O(n^2) +=)
+        web_sources_text = "".join(
+            f"[{i}] {result.title}\nURL: {result.url}\nContent: {result.content[:200]}...\n\n"
+            for i, result in enumerate(itertools.islice(web_results, 5), 1)
+        )
         
         # Try Gemini API first
         if model and GEMINI_API_KEY:
             try:
-                context = f"""
-                Based on the following medical and health information sources, provide a comprehensive and accurate response to the user's question: "{query}"
-                
-                Web Sources:
-                {web_context}
-                
-                Local Medical Documents:
-                {local_context}
-                
-                Please provide:
-                1. A clear, evidence-based answer
-                2. Key medical findings
-                3. Important disclaimers about seeking professional medical advice
-                4. Reference to the provided sources
-                """
-                
+                context = build_prompt(query, web_context, local_context)
                 response = model.generate_content(context)
-                return {
+                result = {
                     "response": response.text,
                     "sources": sources,
-                    "timestamp": datetime.now()
+                    "timestamp": now_iso()
                 }
+                RESP_CACHE[cache_key] = result
+                return result
             except Exception as e:
                 logger.warning(f"Gemini API error: {e}. Using fallback response.")
         
@@ -273,45 +606,49 @@ Refer to the sources listed above for detailed information and verification."""
         return {
             "response": fallback_response,
             "sources": sources,
-            "timestamp": datetime.now()
+            "timestamp": now_iso()
         }
     except Exception as e:
         logger.error(f"Response generation error: {e}")
         return {
             "response": "I apologize, but I encountered an error while processing your request. Please try again.",
             "sources": [],
-            "timestamp": datetime.now()
+            "timestamp": now_iso()
         }
 
 # API Endpoints
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now()}
+    return {"status": "healthy", "timestamp": now_iso()}
 
-@app.post("/api/chat", response_model=ChatResponse)
+@app.post("/api/chat", response_model=ChatResponse, response_model_exclude_none=True)
 async def chat_endpoint(request: ChatMessage):
     try:
         query = request.message
         session_id = request.session_id or str(uuid.uuid4())
         
-        # Perform searches
-        web_results = []
-        local_results = []
-        
-        if request.include_web_search and SERPER_API_KEY:
-            web_results = await search_web(query)
-        
-        if request.include_local_search:
-            local_results = await search_local_documents(query)
+        # Perform searches concurrently; wall clock becomes max(web, local)
+        # instead of their sum
+        web_task = (
+            search_web(query)
+            if request.include_web_search and SERPER_API_KEY
+            else asyncio.sleep(0, result=[])
+        )
+        local_task = (
+            search_local_documents(query)
+            if request.include_local_search
+            else asyncio.sleep(0, result=[])
+        )
+        web_results, local_results = await asyncio.gather(web_task, local_task)
         
         # Generate AI response
         result = await generate_ai_response(query, web_results, local_results)
         
         return ChatResponse(
             response=result["response"],
-            sources=result["sources"],
+            sources=preview_sources(result["sources"]),
             session_id=session_id,
-            timestamp=result["timestamp"].isoformat()
+            timestamp=result["timestamp"]
         )
     except Exception as e:
         logger.error(f"Chat endpoint error: {e}")
@@ -329,10 +666,15 @@ async def upload_file(file: UploadFile = File(...)):
         unique_filename = f"{uuid.uuid4()}{file_extension}"
         file_path = upload_dir / unique_filename
         
-        # Save file
+        # Stream to disk in 1 MiB chunks: memory stays bounded for large
+        # PDFs and the event loop can interleave other requests between
+        # writes. Hash on the fly so identical uploads can be deduplicated.
+        hasher = hashlib.blake2b(digest_size=16)
         async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+            while chunk := await file.read(1 << 20):
+                hasher.update(chunk)
+                await f.write(chunk)
+        content_hash = hasher.hexdigest()
         
         # TODO: Process file and add to vector database
         # For now, just return success
@@ -343,7 +685,8 @@ async def upload_file(file: UploadFile = File(...)):
         return {
             "message": f"File {file.filename} uploaded successfully",
             "document_id": document_id,
-            "filename": file.filename
+            "filename": file.filename,
+            "content_hash": content_hash
         }
     except Exception as e:
         logger.error(f"Upload error: {e}")
@@ -364,7 +707,7 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     try:
         while True:
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            message_data = orjson.loads(data)
             
             # Process message
             if message_data.get("type") == "chat":
@@ -372,25 +715,52 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                 
                 # Send acknowledgment
                 await manager.send_personal_message(
-                    json.dumps({"type": "status", "message": "Processing your request..."}),
+                    orjson.dumps({"type": "status", "message": "Processing your request..."}).decode(),
                     websocket
                 )
                 
-                # Perform search and generate response
-                web_results = await search_web(query) if SERPER_API_KEY else []
-                local_results = await search_local_documents(query)
-                result = await generate_ai_response(query, web_results, local_results)
+                # Run both searches concurrently
+                web_results, local_results = await asyncio.gather(
+                    search_web(query) if SERPER_API_KEY else asyncio.sleep(0, result=[]),
+                    search_local_documents(query)
+                )
+
+                # Stream tokens as Gemini produces them; the client renders
+                # progressively at first-token latency
+                streamed = False
+                if model and GEMINI_API_KEY:
+                    try:
+                        web_context, local_context = build_contexts(web_results, local_results)
+                        context = build_prompt(query, web_context, local_context)
+                        parts = []
+                        async for text in stream_gemini(context):
+                            parts.append(text)
+                            await manager.send_personal_message(
+                                orjson.dumps({"type": "delta", "text": text}).decode(),
+                                websocket
+                            )
+                        result = {
+                            "response": "".join(parts),
+                            "sources": web_results + local_results,
+                            "timestamp": now_iso()
+                        }
+                        streamed = True
+                    except Exception as e:
+                        logger.warning(f"Gemini streaming error: {e}. Using fallback response.")
+
+                if not streamed:
+                    result = await generate_ai_response(query, web_results, local_results)
                 
-                # Send response
+                # Send final response frame
                 await manager.send_personal_message(
-                    json.dumps({
+                    orjson.dumps({
                         "type": "response",
                         "data": {
                             "response": result["response"],
-                            "sources": [source.dict() for source in result["sources"]],
-                            "timestamp": result["timestamp"].isoformat()
+                            "sources": [source.dict() for source in preview_sources(result["sources"])],
+                            "timestamp": result["timestamp"]
                         }
-                    }),
+                    }).decode(),
                     websocket
                 )
     except WebSocketDisconnect:
@@ -400,4 +770,14 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=API_PORT)
+    # uvloop + httptools (bundled with uvicorn[standard]) cut event-loop and
+    # HTTP-parsing overhead vs asyncio/h11; the import-string form is what
+    # lets uvicorn spawn one worker per core
+    uvicorn.run(
+        "main_backup:app",
+        host="0.0.0.0",
+        port=API_PORT,
+        loop="uvloop",
+        http="httptools",
+        workers=os.cpu_count() or 1,
+    )